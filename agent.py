@@ -1,25 +1,83 @@
 import os
+import re
 import sys
-import difflib
+import asyncio
+import itertools
+import json
+import inspect
+import hashlib
+import functools
+import threading
 import importlib.util
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
+import camelot
 import pandas as pd
-from groq import Groq
+from groq import AsyncGroq
 from dotenv import load_dotenv
 
-load_dotenv()
-
 # ============================
 # GROQ CLIENT CONFIGURATION
 # ============================
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
 GROQ_MODEL = "llama-3.1-8b-instant"
 
+# Cached responses live on disk, keyed by a hash of the full request. Only
+# responses that produced a passing parser are stored, so failed attempts are
+# asked again on the next run. Bump the schema version whenever the prompt
+# layout changes meaningfully.
+CACHE_DIR = Path(".cache/groq")
+CACHE_SCHEMA_VERSION = 3
+MEMORY_CACHE_SIZE = 128
+SYSTEM_PROMPT = "You are an expert in Python code generation for data processing."
+
+# Filled in once per run by build_parser_prompt with the target and expected rows
+USER_PROMPT_TEMPLATE = """
+As a senior Python developer, your task is to create a script for extracting data from a PDF bank statement.
+The script should output a clean pandas DataFrame.
+
+Target Institution: {target}
+
+The final script MUST be a Python module with a single function: parse(pdf_path: str, tables: list[pd.DataFrame] | None = None) -> pd.DataFrame
+
+Please adhere to these specifications:
+1.  Use the `camelot-py` library with `flavor='stream'` for table extraction from the stream-based PDF.
+    If `tables` is provided, it already holds the raw extracted tables (`tbl.df` for every camelot table, in page order); use it as-is and do not call camelot.
+2.  The PDF might span multiple pages. Ensure you process all pages and merge the tables into one DataFrame.
+3.  The raw extracted tables may include headers or irrelevant data. Filter out any rows that aren't transactions. A reliable indicator of a transaction row is a valid date in the first column.
+4.  The final DataFrame must have these exact columns in this sequence: ['Date', 'Description', 'Debit Amt', 'Credit Amt', 'Balance']
+5.  Data Transformation Rules:
+    - The 'Date' column should be formatted as a 'DD-MM-YYYY' string.
+    - The 'Description' column might contain newlines (`\\n`); replace these with a single space.
+    - 'Debit Amt', 'Credit Amt', and 'Balance' columns must be numeric (float). Use `pd.to_numeric` with `errors='coerce'` to handle non-numeric data, which will be converted to `NaN`. Do not fill `NaN` values.
+
+For your reference, here are the first 5 rows of the target output DataFrame:
+{expected_head_str}
+
+Return nothing but the complete, raw Python code for the parser. Omit any explanations, markdown formatting, or introductory text.
+    """
+
+# Attempts run concurrently; each one samples at its own temperature
+# so they explore different outputs instead of converging on the same one.
+ATTEMPT_TEMPERATURES = (0.0, 0.1, 0.3)
+
+# Completions sampled per API request. Groq currently rejects n > 1 with a
+# 400, so each attempt asks for one; raise this for providers that allow more.
+CANDIDATES_PER_REQUEST = 1
+
 # ============================
 # UTILITY FUNCTIONS
 # ============================
 
+@functools.cache
+def _get_client() -> AsyncGroq:
+    """
+    Loads .env and creates the Groq client on first use, so importing this
+    module (e.g. from tests) needs neither an API key nor a network client.
+    """
+    load_dotenv()
+    return AsyncGroq(api_key=os.getenv("GROQ_API_KEY"))
+
 def read_csv_as_df(csv_path: str) -> pd.DataFrame:
     """
     Reads a CSV file into a pandas DataFrame, ensuring correct data types.
@@ -27,17 +85,67 @@ def read_csv_as_df(csv_path: str) -> pd.DataFrame:
     """
     df = pd.read_csv(csv_path)
     # Coerce numeric columns to handle potential non-numeric entries
-    for col in ['Debit Amt', 'Credit Amt', 'Balance']:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
+    num_cols = ['Debit Amt', 'Credit Amt', 'Balance']
+    df[num_cols] = df[num_cols].apply(pd.to_numeric, errors='coerce')
     return df
 
+# Suffixes for temporary parser module names; paired with the PID so concurrent runs never share a file
+_module_counter = itertools.count()
+
+# Date layouts the fallback parser can be specialized on, tried in order
+FALLBACK_DATE_PATTERNS = (
+    r"(?:0[1-9]|[12]\d|3[01])-(?:0[1-9]|1[0-2])-\d{4}",  # DD-MM-YYYY
+    r"(?:0[1-9]|[12]\d|3[01])/(?:0[1-9]|1[0-2])/\d{4}",  # DD/MM/YYYY
+    r"\d{4}-(?:0[1-9]|1[0-2])-(?:0[1-9]|[12]\d|3[01])",  # YYYY-MM-DD
+)
+
+# Guards the table cache so concurrent attempts extract a PDF only once
+_tables_lock = threading.Lock()
+
+@functools.lru_cache(maxsize=4)
+def _extract_tables_cached(pdf_path: str, mtime: float) -> list[pd.DataFrame]:
+    """
+    Memoized camelot extraction of every table in the PDF. `mtime` is only
+    part of the cache key. Callers must not modify the returned frames.
+    """
+    return [tbl.df for tbl in camelot.read_pdf(pdf_path, pages="all", flavor="stream")]
+
+def extract_tables(pdf_path: str) -> list[pd.DataFrame]:
+    """Returns private copies of the cached camelot tables for the PDF."""
+    with _tables_lock:
+        tables = _extract_tables_cached(pdf_path, os.path.getmtime(pdf_path))
+    return [df.copy() for df in tables]
+
+def call_parse(parse, pdf_path: str) -> pd.DataFrame:
+    """
+    Calls a generated `parse` function, handing it the pre-extracted tables
+    when it accepts a `tables` argument so it can skip camelot entirely.
+    """
+    if "tables" in inspect.signature(parse).parameters:
+        return parse(pdf_path, tables=extract_tables(pdf_path))
+    return parse(pdf_path)
+
 def run_generated_code(code: str, pdf_path: str, target: str) -> pd.DataFrame:
     """
     Dynamically executes the generated parser code and returns a DataFrame.
-    The generated code must contain a `parse(pdf_path)` function.
+    The generated code must contain a `parse(pdf_path, tables=None)` function.
+    Code is compiled and executed in memory; a module file is only written
+    when the code needs `__file__`.
+    """
+    if "__file__" in code:
+        return run_generated_code_from_file(code, pdf_path, target)
+
+    namespace = {"__name__": f"parser_for_{target}"}
+    exec(compile(code, f"<parser_for_{target}>", "exec"), namespace)
+    return call_parse(namespace["parse"], pdf_path)
+
+def run_generated_code_from_file(code: str, pdf_path: str, target: str) -> pd.DataFrame:
+    """
+    Loads the generated parser code from a temporary module file and runs it.
+    Only used for code that relies on `__file__`.
     """
     # Use the 'target' variable to create a unique, dynamic module name
-    parser_module_name = f"parser_for_{target}_{os.urandom(4).hex()}"
+    parser_module_name = f"parser_for_{target}_{os.getpid()}_{next(_module_counter)}"
     
     temp_dir = Path("custom_parsers")
     temp_dir.mkdir(exist_ok=True)
@@ -52,55 +160,94 @@ def run_generated_code(code: str, pdf_path: str, target: str) -> pd.DataFrame:
         module = importlib.util.module_from_spec(spec)
         sys.modules[f"custom_parsers.{parser_module_name}"] = module
         spec.loader.exec_module(module)
-        return module.parse(pdf_path)
+        return call_parse(module.parse, pdf_path)
     finally:
-        # Clean up the temporary parser file after execution
+        # Clean up the temporary parser file and its module entry after execution
+        sys.modules.pop(f"custom_parsers.{parser_module_name}", None)
         if parser_file.exists():
             parser_file.unlink()
 
-def ask_groq_for_parser(target: str, pdf_path: str, csv_path: str) -> str:
+def _completion_cache_file(system_prompt: str, user_prompt: str, temperature: float, attempt: int, n: int) -> Path:
+    """Returns the on-disk cache location for a completion request."""
+    key_data = {
+        "schema": CACHE_SCHEMA_VERSION,
+        "model": GROQ_MODEL,
+        "system": system_prompt,
+        "user": user_prompt,
+        "temperature": temperature,
+        "attempt": attempt,
+        "n": n,
+    }
+    key = hashlib.sha256(json.dumps(key_data, sort_keys=True).encode()).hexdigest()
+    return CACHE_DIR / f"{key}.json"
+
+def cached_completion(func):
     """
-    Requests parser code from the Groq API using a detailed prompt.
+    Caches LLM completions in memory, and reads completions stored on disk
+    under CACHE_DIR. The key covers the model, schema version and every
+    request argument, so a hit returns exactly what the API would have been
+    asked for. Disk entries are only written by store_completion.
     """
-    expected_df = read_csv_as_df(csv_path)
-    expected_head_str = expected_df.head(5).to_string()
-
-    prompt = f"""
-As a senior Python developer, your task is to create a script for extracting data from a PDF bank statement.
-The script should output a clean pandas DataFrame.
-
-Target Institution: {target}
-
-The final script MUST be a Python module with a single function: parse(pdf_path: str) -> pd.DataFrame
+    memory: dict[Path, list[str]] = {}
 
-Please adhere to these specifications:
-1.  Use the `camelot-py` library with `flavor='stream'` for table extraction from the stream-based PDF.
-2.  The PDF might span multiple pages. Ensure you process all pages and merge the tables into one DataFrame.
-3.  The raw extracted tables may include headers or irrelevant data. Filter out any rows that aren't transactions. A reliable indicator of a transaction row is a valid date in the first column.
-4.  The final DataFrame must have these exact columns in this sequence: ['Date', 'Description', 'Debit Amt', 'Credit Amt', 'Balance']
-5.  Data Transformation Rules:
-    - The 'Date' column should be formatted as a 'DD-MM-YYYY' string.
-    - The 'Description' column might contain newlines (`\\n`); replace these with a single space.
-    - 'Debit Amt', 'Credit Amt', and 'Balance' columns must be numeric (float). Use `pd.to_numeric` with `errors='coerce'` to handle non-numeric data, which will be converted to `NaN`. Do not fill `NaN` values.
-
-For your reference, here are the first 5 rows of the target output DataFrame:
-{expected_head_str}
+    @functools.wraps(func)
+    async def wrapper(system_prompt: str, user_prompt: str, temperature: float, attempt: int = 1, n: int = 1) -> list[str]:
+        cache_file = _completion_cache_file(system_prompt, user_prompt, temperature, attempt, n)
+        if cache_file in memory:
+            return memory[cache_file]
 
-Return nothing but the complete, raw Python code for the parser. Omit any explanations, markdown formatting, or introductory text.
+        if cache_file.exists():
+            candidates = json.loads(cache_file.read_text(encoding="utf-8"))
+        else:
+            candidates = await func(system_prompt, user_prompt, temperature, attempt, n)
+
+        # Evict the oldest entry once the in-process layer is full
+        if len(memory) >= MEMORY_CACHE_SIZE:
+            memory.pop(next(iter(memory)))
+        memory[cache_file] = candidates
+        return candidates
+    return wrapper
+
+def store_completion(system_prompt: str, user_prompt: str, temperature: float, attempt: int, n: int, candidates: list[str]):
+    """Persists completions that produced a passing parser, so later runs can replay them."""
+    cache_file = _completion_cache_file(system_prompt, user_prompt, temperature, attempt, n)
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    cache_file.write_text(json.dumps(candidates), encoding="utf-8")
+
+@cached_completion
+async def request_completion(system_prompt: str, user_prompt: str, temperature: float, attempt: int = 1, n: int = 1) -> list[str]:
     """
-
-    resp = client.chat.completions.create(
+    Sends a single chat completion request to the Groq API and returns all
+    `n` sampled completions. `attempt` is only part of the cache key, so each
+    retry gets its own entry.
+    """
+    resp = await _get_client().chat.completions.create(
         model=GROQ_MODEL,
         messages=[
-            {"role": "system", "content": "You are an expert in Python code generation for data processing."},
-            {"role": "user", "content": prompt}
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
         ],
-        temperature=0.1,
+        temperature=temperature,
+        n=n,
     )
-    return resp.choices[0].message.content
+    return [choice.message.content or "" for choice in resp.choices]
 
-def run_test(target: str, pdf_path: str, csv_path: str, code: str) -> tuple[bool, str]:
-    """Compares the generated DataFrame against the expected CSV to validate correctness."""
+def build_parser_prompt(target: str, expected_df: pd.DataFrame) -> str:
+    """Renders the parser request prompt; built once per run and shared by every attempt."""
+    return USER_PROMPT_TEMPLATE.format(target=target, expected_head_str=expected_df.head(5).to_string())
+
+async def ask_groq_for_parser(prompt: str, attempt: int = 1, temperature: float = 0.1) -> list[str]:
+    """
+    Requests candidate parser code from the Groq API using a prompt from build_parser_prompt.
+    Returns CANDIDATES_PER_REQUEST candidates from a single round-trip.
+    """
+    return await request_completion(SYSTEM_PROMPT, prompt, temperature, attempt, CANDIDATES_PER_REQUEST)
+
+def run_test(target: str, pdf_path: str, expected_df: pd.DataFrame, code: str, cancelled: threading.Event | None = None) -> tuple[bool, str]:
+    """
+    Compares the generated DataFrame against the expected data to validate correctness.
+    If `cancelled` is set by the time the parser has run, nothing is written to output/.
+    """
     if not code or not code.strip():
         return False, "The LLM returned an empty code block."
     
@@ -110,15 +257,30 @@ def run_test(target: str, pdf_path: str, csv_path: str, code: str) -> tuple[bool
     except Exception as e:
         return False, f"Code Execution Failed (Import/Runtime):\n{e}"
 
-    expected_df = read_csv_as_df(csv_path)
+    # The expected frame is shared across attempts, so reset its index without mutating it
+    expected_df = expected_df.reset_index(drop=True)
     generated_df.reset_index(drop=True, inplace=True)
-    expected_df.reset_index(drop=True, inplace=True)
     
+    # Cheap structural checks first, so mismatches never reach the full comparison
+    if generated_df.shape != expected_df.shape:
+        return False, f"Shape mismatch.\nExpected: {expected_df.shape}\nReceived: {generated_df.shape}"
+
     if list(generated_df.columns) != list(expected_df.columns):
         return False, f"Column mismatch.\nExpected: {expected_df.columns.to_list()}\nReceived: {generated_df.columns.to_list()}"
 
+    dtype_mismatch = generated_df.dtypes != expected_df.dtypes
+    if dtype_mismatch.any():
+        bad_cols = dtype_mismatch[dtype_mismatch].index.to_list()
+        details = ", ".join(
+            f"{col}: expected {expected_df[col].dtype}, received {generated_df[col].dtype}" for col in bad_cols
+        )
+        return False, f"Dtype mismatch.\n{details}"
+
     # Use DataFrame.equals for a precise match as per the challenge requirements
     if generated_df.equals(expected_df):
+        if cancelled is not None and cancelled.is_set():
+            return False, "Cancelled: another attempt already passed."
+
         output_dir = Path("output")
         output_dir.mkdir(exist_ok=True)
         output_path = output_dir / f"{target}_output.csv"
@@ -130,51 +292,82 @@ def run_test(target: str, pdf_path: str, csv_path: str, code: str) -> tuple[bool
         )
         return True, success_msg
     else:
-        # Generate a diff to help debug mismatches
-        diff = difflib.unified_diff(
-            expected_df.to_string().splitlines(),
-            generated_df.to_string().splitlines(),
-            lineterm=""
-        )
-        error_details = "Data mismatch found. Debugging diff:\n" + "\n".join(list(diff)[:40])
+        # Show only the differing cells, one received/expected row pair per mismatching row
+        mismatch = generated_df.compare(expected_df, align_axis=0, result_names=("received", "expected"))
+        error_details = "Data mismatch found. Debugging diff:\n" + mismatch.head(20).to_string()
         return False, error_details
 
-def make_fallback_parser_code() -> str:
-    """Provides a robust, deterministic fallback parser using Camelot."""
-    return """
+def verify_standalone(target: str, pdf_path: str, expected_df: pd.DataFrame, code: str) -> tuple[bool, str]:
+    """
+    Runs the parser the way the saved file is used, as a plain `parse(pdf_path)`
+    in a fresh namespace without pre-extracted tables, and checks it still matches.
+    run_test only exercises the `tables=` path, so this covers the standalone one.
+    """
+    parser_path = Path("custom_parsers") / f"{target}_parser.py"
+    namespace = {"__name__": f"{target}_parser", "__file__": str(parser_path)}
+    try:
+        exec(compile(code, str(parser_path), "exec"), namespace)
+        parsed_df = namespace["parse"](pdf_path)
+    except Exception as e:
+        return False, f"Standalone parse(pdf_path) failed:\n{e}"
+
+    if parsed_df.reset_index(drop=True).equals(expected_df.reset_index(drop=True)):
+        return True, "Standalone parse(pdf_path) matches the expected data."
+    return False, "Standalone parse(pdf_path) output does not match the expected data."
+
+def _fallback_date_pattern(sample: str) -> str:
+    """Returns the first known date pattern that matches a sample date, defaulting to DD-MM-YYYY."""
+    for pattern in FALLBACK_DATE_PATTERNS:
+        if re.fullmatch(pattern, sample.strip()):
+            return pattern
+    return FALLBACK_DATE_PATTERNS[0]
+
+def make_fallback_parser_code(expected_df: pd.DataFrame) -> str:
+    """
+    Provides a robust, deterministic fallback parser using Camelot.
+    The parser is specialized on the expected schema: column names, amount
+    columns and the date format are baked in, so it needs no header search.
+    """
+    columns = expected_df.columns.to_list()
+    date_col = columns[0]
+    num_cols = [col for col in columns if pd.api.types.is_numeric_dtype(expected_df[col])]
+    text_cols = [col for col in columns[1:] if col not in num_cols]
+    # An expected CSV with no rows (or no dates) falls back to the default pattern
+    dates = expected_df[date_col].dropna()
+    date_pattern = _fallback_date_pattern(str(dates.iloc[0]) if not dates.empty else "")
+
+    return f"""
+import re
+
 import pandas as pd
 import camelot
 
-def parse(pdf_path: str) -> pd.DataFrame:
-    tables = camelot.read_pdf(pdf_path, pages="all", flavor="stream")
+COLUMNS = {columns!r}
+NUM_COLS = {num_cols!r}
+TEXT_COLS = {text_cols!r}
+_DATE_RE = re.compile(r'{date_pattern}')
+
+def parse(pdf_path: str, tables: list[pd.DataFrame] | None = None) -> pd.DataFrame:
+    # The agent passes tables it already extracted; standalone use reads the PDF
+    if tables is None:
+        tables = [tbl.df for tbl in camelot.read_pdf(pdf_path, pages="all", flavor="stream")]
     if not tables:
         raise ValueError("Could not find any tables in the PDF.")
-    df = pd.concat([tbl.df for tbl in tables], ignore_index=True)
-    
-    header_idx = -1
-    for i, row in df.iterrows():
-        if 'Date' in str(row[0]) and 'Description' in str(row[1]):
-            header_idx = i
-            break
-            
-    if header_idx != -1:
-        df.columns = df.iloc[header_idx]
-        df = df.iloc[header_idx + 1:].reset_index(drop=True)
-        
-    if df.shape[1] == 5:
-        df.columns = ['Date', 'Description', 'Debit Amt', 'Credit Amt', 'Balance']
+    # A single-page table needs no concat
+    if len(tables) == 1:
+        df = tables[0]
     else:
-        df = df[df[0].str.match(r'\\d{2}-\\d{2}-\\d{4}', na=False)]
-        df = df.iloc[:, :5]
-        df.columns = ['Date', 'Description', 'Debit Amt', 'Credit Amt', 'Balance']
-        
-    df['Description'] = df['Description'].str.replace('\\n', ' ', regex=False).str.strip()
-    
-    for col in ['Debit Amt', 'Credit Amt', 'Balance']:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-    df.dropna(subset=['Date'], inplace=True)
-    df = df[df['Date'].str.match(r'\\d{2}-\\d{2}-\\d{4}', na=False)].reset_index(drop=True)
+        df = pd.concat(tables, ignore_index=True)
+
+    # Transaction rows start with a date; header and summary rows drop out here
+    df = df[df.iloc[:, 0].str.match(_DATE_RE, na=False)].iloc[:, :len(COLUMNS)].reset_index(drop=True)
+    df.columns = COLUMNS
+
+    for col in TEXT_COLS:
+        df[col] = df[col].str.replace('\\n', ' ', regex=False).str.strip()
+
+    # Convert the amount columns in one pass, on transaction rows only
+    df[NUM_COLS] = df[NUM_COLS].apply(pd.to_numeric, errors='coerce')
     return df
 """
 
@@ -190,12 +383,20 @@ def save_parser_code(target: str, code: str):
 
     parser_path = output_dir / f"{target}_parser.py"
 
-    # --- DEBUGGING PREVIEW ---
-    print(f"\nSaving generated code to {parser_path}:")
-    print("--- CODE PREVIEW (first 5 lines) ---")
-    print('\n'.join(code.split('\n')[:5]))
-    print("...")
-    print("--- END PREVIEW ---\n")
+    # Re-running the agent often yields the same parser (cached reply or fallback)
+    if parser_path.exists() and parser_path.read_text(encoding="utf-8") == code:
+        print(f"\n✅ Parser file already up to date: {parser_path}")
+        return
+
+    # --- DEBUGGING PREVIEW (set AGENT_DEBUG to enable) ---
+    if os.environ.get("AGENT_DEBUG"):
+        print(f"\nSaving generated code to {parser_path}:")
+        print("--- CODE PREVIEW (first 5 lines) ---")
+        print('\n'.join(code.split('\n')[:5]))
+        print("...")
+        print("--- END PREVIEW ---\n")
+    else:
+        print(f"\nSaving generated code to {parser_path} ({len(code.splitlines())} lines)")
 
     parser_path.write_text(code, encoding="utf-8")
     print(f"✅ Parser file saved successfully: {parser_path}")
@@ -204,6 +405,75 @@ def save_parser_code(target: str, code: str):
 # MAIN EXECUTION BLOCK
 # ============================
 
+async def run_attempt(
+    target: str,
+    pdf_path: str,
+    expected_df: pd.DataFrame,
+    prompt: str,
+    attempt_num: int,
+    temperature: float,
+    executor: ThreadPoolExecutor,
+    cancelled: threading.Event,
+) -> tuple[bool, str, str]:
+    """
+    Requests candidate parsers in one API call and tests them in order on `executor`.
+    Returns (is_ok, message, code) for the first passing candidate, or the last failure.
+    Stops before testing the next candidate once `cancelled` is set.
+    """
+    try:
+        candidates = await ask_groq_for_parser(prompt, attempt_num, temperature)
+        is_ok, result_message, generated_code = False, "The LLM returned no candidates.", ""
+        for candidate_num, generated_code in enumerate(candidates, start=1):
+            if generated_code.strip().startswith("```python"):
+                generated_code = generated_code.strip()[9:].strip("`").strip()
+
+            if cancelled.is_set():
+                return False, "Cancelled: another attempt already passed.", ""
+
+            # Parsing the PDF blocks, so keep it off the event loop while other attempts wait on the API
+            is_ok, result_message = await asyncio.get_running_loop().run_in_executor(
+                executor, run_test, target, pdf_path, expected_df, generated_code, cancelled
+            )
+            if is_ok:
+                store_completion(SYSTEM_PROMPT, prompt, temperature, attempt_num, CANDIDATES_PER_REQUEST, candidates)
+                break
+            label = f"Attempt {attempt_num}" if len(candidates) == 1 else f"Attempt {attempt_num}, candidate {candidate_num}"
+            print(f"{label} failed: {result_message}")
+        return is_ok, result_message, generated_code
+    except Exception as e:
+        print(f"An unexpected error occurred during attempt {attempt_num}: {e}")
+        return False, str(e), ""
+
+async def run_attempts(target: str, pdf_path: str, expected_df: pd.DataFrame, max_retries: int) -> str | None:
+    """
+    Launches all LLM attempts concurrently and returns the code of the first
+    one that passes, cancelling the rest. Returns None if every attempt fails.
+    A test that is already running cannot be interrupted; it finishes in the
+    background without writing output, and the result is returned without waiting for it.
+    """
+    prompt = build_parser_prompt(target, expected_df)
+    # A private executor, so asyncio.run does not join still-running tests on exit
+    executor = ThreadPoolExecutor(max_workers=max_retries)
+    cancelled = threading.Event()
+    tasks = []
+    for attempt_num in range(1, max_retries + 1):
+        temperature = ATTEMPT_TEMPERATURES[(attempt_num - 1) % len(ATTEMPT_TEMPERATURES)]
+        print(f"--- ATTEMPT {attempt_num}/{max_retries} (temperature={temperature}) ---")
+        tasks.append(asyncio.create_task(run_attempt(target, pdf_path, expected_df, prompt, attempt_num, temperature, executor, cancelled)))
+
+    try:
+        for finished in asyncio.as_completed(tasks):
+            is_ok, result_message, generated_code = await finished
+            if is_ok:
+                print(result_message)
+                return generated_code
+    finally:
+        cancelled.set()
+        for task in tasks:
+            task.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+    return None
+
 def main():
     if len(sys.argv) < 3 or sys.argv[1] != "--target":
         print("Usage: python agent.py --target <bank_name>")
@@ -219,37 +489,30 @@ def main():
         print(f"Error: Required files not found. Check for '{pdf_path}' and '{csv_path}'.")
         sys.exit(1)
 
-    max_retries = 3
-    is_successful = False
+    # Read the expected output once; every attempt and the fallback share it
+    expected_df = read_csv_as_df(str(csv_path))
 
-    for attempt_num in range(1, max_retries + 1):
-        print(f"--- ATTEMPT {attempt_num}/{max_retries} ---")
-        try:
-            generated_code = ask_groq_for_parser(target_bank, str(pdf_path), str(csv_path))
-            if generated_code.strip().startswith("```python"):
-                generated_code = generated_code.strip()[9:].strip("`").strip()
+    max_retries = 3
+    generated_code = asyncio.run(run_attempts(target_bank, str(pdf_path), expected_df, max_retries))
 
-            is_ok, result_message = run_test(target_bank, str(pdf_path), str(csv_path), generated_code)
-            
-            if is_ok:
-                print(result_message)
-                save_parser_code(target_bank, generated_code)
-                is_successful = True
-                break
-            else:
-                print(f"Attempt {attempt_num} failed: {result_message}")
-        except Exception as e:
-            print(f"An unexpected error occurred during attempt {attempt_num}: {e}")
-
-    if not is_successful:
-        print("\nLLM attempts failed. Deploying deterministic fallback parser.")
-        fallback_code = make_fallback_parser_code()
-        is_ok, result_message = run_test(target_bank, str(pdf_path), str(csv_path), fallback_code)
+    # Validation ran with pre-extracted tables; check the saved file's own path once before saving
+    if generated_code is not None:
+        is_ok, result_message = verify_standalone(target_bank, str(pdf_path), expected_df, generated_code)
         if is_ok:
-            print(result_message)
-            save_parser_code(target_bank, fallback_code)
-        else:
-            print(f"❌ Fallback parser failed to match the expected CSV. Details:\n{result_message}")
+            save_parser_code(target_bank, generated_code)
+            return
+        print(f"❌ Passing LLM parser failed its standalone check. Details:\n{result_message}")
+
+    print("\nLLM attempts failed. Deploying deterministic fallback parser.")
+    fallback_code = make_fallback_parser_code(expected_df)
+    is_ok, result_message = run_test(target_bank, str(pdf_path), expected_df, fallback_code)
+    if is_ok:
+        is_ok, result_message = verify_standalone(target_bank, str(pdf_path), expected_df, fallback_code)
+    if is_ok:
+        print(result_message)
+        save_parser_code(target_bank, fallback_code)
+    else:
+        print(f"❌ Fallback parser failed to match the expected CSV. Details:\n{result_message}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
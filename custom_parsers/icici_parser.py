@@ -1,35 +1,33 @@
 
+import re
+
 import pandas as pd
 import camelot
 
-def parse(pdf_path: str) -> pd.DataFrame:
-    tables = camelot.read_pdf(pdf_path, pages="all", flavor="stream")
+COLUMNS = ['Date', 'Description', 'Debit Amt', 'Credit Amt', 'Balance']
+NUM_COLS = ['Debit Amt', 'Credit Amt', 'Balance']
+TEXT_COLS = ['Description']
+_DATE_RE = re.compile(r'(?:0[1-9]|[12]\d|3[01])-(?:0[1-9]|1[0-2])-\d{4}')
+
+def parse(pdf_path: str, tables: list[pd.DataFrame] | None = None) -> pd.DataFrame:
+    # The agent passes tables it already extracted; standalone use reads the PDF
+    if tables is None:
+        tables = [tbl.df for tbl in camelot.read_pdf(pdf_path, pages="all", flavor="stream")]
     if not tables:
         raise ValueError("Could not find any tables in the PDF.")
-    df = pd.concat([tbl.df for tbl in tables], ignore_index=True)
-    
-    header_idx = -1
-    for i, row in df.iterrows():
-        if 'Date' in str(row[0]) and 'Description' in str(row[1]):
-            header_idx = i
-            break
-            
-    if header_idx != -1:
-        df.columns = df.iloc[header_idx]
-        df = df.iloc[header_idx + 1:].reset_index(drop=True)
-        
-    if df.shape[1] == 5:
-        df.columns = ['Date', 'Description', 'Debit Amt', 'Credit Amt', 'Balance']
+    # A single-page table needs no concat
+    if len(tables) == 1:
+        df = tables[0]
     else:
-        df = df[df[0].str.match(r'\d{2}-\d{2}-\d{4}', na=False)]
-        df = df.iloc[:, :5]
-        df.columns = ['Date', 'Description', 'Debit Amt', 'Credit Amt', 'Balance']
-        
-    df['Description'] = df['Description'].str.replace('\n', ' ', regex=False).str.strip()
-    
-    for col in ['Debit Amt', 'Credit Amt', 'Balance']:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-    df.dropna(subset=['Date'], inplace=True)
-    df = df[df['Date'].str.match(r'\d{2}-\d{2}-\d{4}', na=False)].reset_index(drop=True)
+        df = pd.concat(tables, ignore_index=True)
+
+    # Transaction rows start with a date; header and summary rows drop out here
+    df = df[df.iloc[:, 0].str.match(_DATE_RE, na=False)].iloc[:, :len(COLUMNS)].reset_index(drop=True)
+    df.columns = COLUMNS
+
+    for col in TEXT_COLS:
+        df[col] = df[col].str.replace('\n', ' ', regex=False).str.strip()
+
+    # Convert the amount columns in one pass, on transaction rows only
+    df[NUM_COLS] = df[NUM_COLS].apply(pd.to_numeric, errors='coerce')
     return df
@@ -0,0 +1,64 @@
+import asyncio
+
+import agent
+
+SYSTEM = "system prompt"
+USER = "user prompt"
+
+def make_fake_api(calls: list, reply: str = "def parse(pdf_path): ..."):
+    """Builds a stand-in for the Groq request that records each call instead of hitting the network."""
+    async def fake_request(system_prompt, user_prompt, temperature, attempt=1, n=1):
+        calls.append((system_prompt, user_prompt, temperature, attempt, n))
+        return [reply]
+    return fake_request
+
+def test_cache_miss_calls_api_and_writes_nothing(tmp_path, monkeypatch):
+    """
+    A completion that has not been stored yet must come from the API, and
+    must not be written to disk until it produces a passing parser.
+    """
+    monkeypatch.setattr(agent, "CACHE_DIR", tmp_path)
+    calls = []
+    request = agent.cached_completion(make_fake_api(calls))
+
+    candidates = asyncio.run(request(SYSTEM, USER, 0.1, 1, 1))
+
+    assert candidates == ["def parse(pdf_path): ..."]
+    assert len(calls) == 1
+    assert list(tmp_path.iterdir()) == []
+
+def test_store_completion_writes_cache_file(tmp_path, monkeypatch):
+    """
+    store_completion persists the candidates, keyed so that a different attempt,
+    candidate count or schema version never reuses the entry.
+    """
+    monkeypatch.setattr(agent, "CACHE_DIR", tmp_path)
+
+    agent.store_completion(SYSTEM, USER, 0.1, 1, 1, ["code"])
+
+    cache_file = agent._completion_cache_file(SYSTEM, USER, 0.1, 1, 1)
+    assert cache_file.exists()
+    assert cache_file.parent == tmp_path
+
+    # Each part of the key must change the cache location
+    assert agent._completion_cache_file(SYSTEM, USER, 0.1, 2, 1) != cache_file
+    assert agent._completion_cache_file(SYSTEM, USER, 0.1, 1, 3) != cache_file
+    monkeypatch.setattr(agent, "CACHE_SCHEMA_VERSION", agent.CACHE_SCHEMA_VERSION + 1)
+    assert agent._completion_cache_file(SYSTEM, USER, 0.1, 1, 1) != cache_file
+
+def test_stored_completion_is_read_from_disk_without_calling_api(tmp_path, monkeypatch):
+    """
+    Once a passing completion is stored, a later run must replay it from disk
+    instead of making another API request.
+    """
+    monkeypatch.setattr(agent, "CACHE_DIR", tmp_path)
+    agent.store_completion(SYSTEM, USER, 0.1, 1, 1, ["stored code"])
+
+    # A freshly decorated function has an empty in-memory layer, like a new run
+    calls = []
+    request = agent.cached_completion(make_fake_api(calls))
+
+    candidates = asyncio.run(request(SYSTEM, USER, 0.1, 1, 1))
+
+    assert candidates == ["stored code"]
+    assert calls == []